@@ -22,30 +22,36 @@
 # Created by rszabo50 at 2022-02-01
 
 import logging
-import os
 import subprocess
 import time
-import traceback
 
-from urwid import Columns, AttrWrap, Text, RIGHT, raw_display, Pile, ListBox, SimpleListWalker
+from urwid import Columns, AttrWrap, Text, RIGHT, Pile, ListBox, SimpleListWalker
 
 from ucm.Dialogs import DialogDisplay
 from ucm.Registry import Registry
+from ucm.Terminal import SHELL_NOT_RUNNABLE, run_in_terminal, shell_missing
 from ucm.UserConfig import UserConfig
-from ucm.Widgets import ListView
+from ucm.Widgets import ListView, get_cols_rows
 from ucm.constants import MAIN_PALETTE
 
+# images known to lack the requested shell -> the shell to use instead, so later connects exec it directly
+image_shell_cache = {}
+
 
 # noinspection PyStatementEffect
 def docker_connect(data: any, shell: str = 'bash'):
     if Registry().get('main_loop'):
         Registry().main_loop.screen.stop()
         print(chr(27) + "[2J")
+        shell = image_shell_cache.get(data.get('image'), shell)
         print(f"Executing: {UserConfig().docker} exec -it  {data['name']} {shell}")
-        logging.info(f"{UserConfig().docker} exec -it  {data['name']} {shell}")
-        rc = os.system(f"{UserConfig().docker} exec -it  {data['name']} {shell}")
-        if rc == 32256:
-            rc = os.system(f"{UserConfig().docker} exec -it  {data['name']} sh")
+        logging.info('%s exec -it  %s %s', UserConfig().docker, data['name'], shell)
+        rc = run_in_terminal([UserConfig().docker, 'exec', '-it', data['name'], shell])
+        if rc in SHELL_NOT_RUNNABLE and shell != 'sh' and \
+                shell_missing([UserConfig().docker, 'exec', data['name']], shell):
+            if data.get('image'):
+                image_shell_cache[data['image']] = 'sh'
+            rc = run_in_terminal([UserConfig().docker, 'exec', '-it', data['name'], 'sh'])
         if rc != 0:
             print(f"Return code: {rc}")
             time.sleep(5)
@@ -55,9 +61,9 @@ def docker_connect(data: any, shell: str = 'bash'):
 
 # noinspection PyStatementEffect
 def docker_inspect(data: any):
-    proc = subprocess.Popen([f"{UserConfig().docker}", "inspect", f"{data['name']}"], stdout=subprocess.PIPE,
-                            stderr=subprocess.STDOUT)
-    return [Text(x.rstrip()) for x in proc.communicate()[0].splitlines()]
+    proc = subprocess.run([UserConfig().docker, "inspect", data['name']], stdout=subprocess.PIPE,
+                          stderr=subprocess.STDOUT)
+    return [Text(x.rstrip()) for x in proc.stdout.splitlines()]
 
 
 class DockerListView(ListView):
@@ -73,24 +79,21 @@ class DockerListView(ListView):
         data = []
         # noinspection PyBroadException,PyPep8
         try:
-            proc = subprocess.Popen(
-                [UserConfig().docker, 'ps', '--format', 'table {{.ID}}\t{{.Names}}\t{{.Image}}'],
-                stdout=subprocess.PIPE)
-            while True:
-                line = proc.stdout.readline()
-                if not line:
-                    break
-                parts = line.decode('UTF-8').split()
-                if 'CONTAINER' not in parts[0]:
-                    data.append({'containerId': parts[0].strip(), 'name': parts[1].strip(), 'image': parts[2].strip()})
+            # parse rows as docker writes them, leaving the with block waits for (reaps) the process
+            with subprocess.Popen(
+                    [UserConfig().docker, 'ps', '--format', '{{.ID}}\t{{.Names}}\t{{.Image}}'],
+                    stdout=subprocess.PIPE, universal_newlines=True) as proc:
+                for line in proc.stdout:
+                    container_id, name, image = line.rstrip('\n').split('\t', 2)
+                    data.append({'containerId': container_id, 'name': name, 'image': image})
         except Exception as _e:
-            logging.error(traceback.format_exc())
+            logging.exception('Unable to list docker containers')
 
         return data
 
     @staticmethod
     def popup_info_dialog(data):
-        cols, rows = raw_display.Screen().get_cols_rows()
+        cols, rows = get_cols_rows()
         d = DialogDisplay(f"Container Inspection: {data['name']}", cols - 20, rows - 6,
                           body=Pile([
                               ListBox(
@@ -107,11 +110,11 @@ class DockerListView(ListView):
         pass
 
     def double_click_callback(self):
-        logging.debug(f'{self.name}] {self.selected.item_data["name"]} double_click_callback')
+        logging.debug('%s] %s double_click_callback', self.name, self.selected.item_data["name"])
         docker_connect(self.selected.item_data)
 
     def keypress_callback(self, size, key, data: any = None):
-        logging.debug(f'ListViewHandler[{self.name}] {size} {key} pressed')
+        logging.debug('ListViewHandler[%s] %s %s pressed', self.name, size, key)
         if key == 'c':
             docker_connect(data, shell='bash')
         if key == 'i':
@@ -22,8 +22,13 @@
 # Created by rszabo50 at 2022-02-07
 
 
+import logging
+
+
 class Registry(dict):
     __instance = None
+    __widget_ids = set()
+    __id_counters = {}
 
     def __new__(cls, *args):
         if cls.__instance is None:
@@ -37,4 +42,18 @@ class Registry(dict):
     def get(self, k):
         return getattr(self.__instance, k) if hasattr(self.__instance, k) else None
 
+    def register_widget(self, widget_id: str, widget: any):
+        if widget_id in self.__widget_ids or hasattr(self.__instance, widget_id):
+            logging.warning("Registry already has object with widget_id=%s", widget_id)
+            # continue numbering from the last suffix handed out for this id instead of probing from 1
+            base_id = widget_id
+            counter = self.__id_counters.get(base_id, 0)
+            while widget_id in self.__widget_ids or hasattr(self.__instance, widget_id):
+                counter += 1
+                widget_id = f'{base_id}_{counter}'
+            self.__id_counters[base_id] = counter
+        self.__widget_ids.add(widget_id)
+        setattr(self.__instance, widget_id, widget)
+        return widget_id
+
 # vim: ts=4 sw=4 et
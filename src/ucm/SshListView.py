@@ -21,15 +21,16 @@
 
 # Created by rszabo50 at 2022-02-01
 
-import os
-import time
 import logging
+import time
+from shlex import split
 from urwid import Columns, AttrWrap, Text, RIGHT, Pile, ListBox, SimpleListWalker
 from ucm.Widgets import ListView
 from ucm.UserConfig import UserConfig
 from ucm.Registry import Registry
 from ucm.constants import MAIN_PALETTE
 from ucm.Dialogs import DialogDisplay
+from ucm.Terminal import run_in_terminal
 
 
 class SshListView(ListView):
@@ -39,9 +40,6 @@ class SshListView(ListView):
 
     def formatter(self, record: any):
 
-        if 'category' not in record:
-            record['category'] = '---'
-
         display_host = record['name'] if len(record['name']) <= 60 else f'...{record["name"][-57:]}'
         display_category = record['category'] if len(record['category']) <= 20 else f'...{record["category"][-20:]}'
         connection = record['address'] if 'user' not in record else f"{record['user']}@{record['address']}"
@@ -53,11 +51,11 @@ class SshListView(ListView):
         return UserConfig().get('ssh_connections')
 
     def double_click_callback(self):
-        logging.debug(f'{self.name}] {self.selected.item_data["name"]} double_click_callback')
+        logging.debug('%s] %s double_click_callback', self.name, self.selected.item_data["name"])
         self.connect(self.selected.item_data)
 
     def keypress_callback(self, size, key, data: any = None):
-        logging.debug(f'ListViewHandler[{self.name}] {size} {key} pressed')
+        logging.debug('ListViewHandler[%s] %s %s pressed', self.name, size, key)
         if key == 'c':
             self.connect(data)
         if key == 'i':
@@ -98,20 +96,25 @@ class SshListView(ListView):
         #     options: any other ssh options
         #     category: key to group  this buy, makes filtering easier
 
-        user_at_host = data['address'] if 'user' not in data else f"{data['user']}@{data['address']}"
-        ident = f"-i {data['identity']}" if 'identity' in data else ''
-        port = f"-p {data['port']}" if 'port' in data else ''
-        opts = f"{data['options']}" if 'options' in data else ''
-        return f"ssh {ident} {port} {opts} {user_at_host}"
+        # returns the argv list, ssh is run without a shell in between
+        command = ['ssh']
+        if 'identity' in data:
+            command.extend(('-i', str(data['identity'])))
+        if 'port' in data:
+            command.extend(('-p', str(data['port'])))
+        if 'options' in data:
+            command.extend(split(str(data['options'])))
+        command.append(str(data['address']) if 'user' not in data else f"{data['user']}@{data['address']}")
+        return command
 
     def connect(self, data: any):
         if Registry().get('main_loop'):
             Registry().main_loop.screen.stop()
             print(chr(27) + "[2J")
             cmd = self.build_ssh_command(data)
-            print(f"Executing: {cmd}")
-            logging.info(f"{cmd}")
-            rc = os.system(f"{cmd}")
+            print(f"Executing: {' '.join(cmd)}")
+            logging.info('%s', cmd)
+            rc = run_in_terminal(cmd)
             if rc != 0:
                 print(f"Return code: {rc}")
                 time.sleep(2)
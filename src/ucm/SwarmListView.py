@@ -25,13 +25,13 @@ import logging
 import os
 import socket
 import subprocess
-import traceback
 import time
 from shlex import split
 
-from urwid import Text, raw_display, Pile, ListBox, SimpleListWalker
-from ucm.Widgets import ListView, ListItem
+from urwid import Text, Pile, ListBox, SimpleListWalker
+from ucm.Widgets import ListView, ListItem, get_cols_rows
 from ucm.Registry import Registry
+from ucm.Terminal import SHELL_NOT_RUNNABLE, run_in_terminal, shell_missing
 from ucm.UserConfig import UserConfig
 from ucm.Dialogs import DialogDisplay
 from ucm.constants import MAIN_PALETTE
@@ -67,18 +67,24 @@ def build_ssh_command(host: str):
 
 # noinspection PyStatementEffect
 def swarm_connect(data: any, shell: str = 'bash'):
-    command = f"docker exec -it  {data['container']} {shell}"
+    command = ['docker', 'exec', '-it', data['container'], shell]
+    probe_command = ['docker', 'exec', data['container']]
     if not host_is_local(data['host']):
-        command = f"{build_ssh_command(data['host'])} {command}"
+        # hosts missing from the ssh connections are reached with a plain ssh
+        ssh_command = split(build_ssh_command(data['host']) or f"ssh -t {data['host']}")
+        command = ssh_command + command
+        # the probe must never stop at a password prompt, it only runs while the screen is stopped anyway
+        probe_command = ssh_command[:1] + ['-o', 'BatchMode=yes'] + ssh_command[1:] + probe_command
 
     if Registry().get('main_loop'):
         Registry().main_loop.screen.stop()
         print(chr(27) + "[2J")
-        print(command)
-        logging.info(command)
-        rc = os.system(command)
-        if rc == 32256:
-            rc = os.system(command.replace(" bash", " sh"))
+        print(' '.join(command))
+        logging.info('%s', command)
+        rc = run_in_terminal(command)
+        if rc in SHELL_NOT_RUNNABLE and shell != 'sh' and shell_missing(probe_command, shell):
+            command[-1] = 'sh'
+            rc = run_in_terminal(command)
         if rc != 0:
             print(f"Return code: {rc}")
             time.sleep(5)
@@ -92,8 +98,8 @@ def swarm_inspect(data: any):
     if not host_is_local(data['host']):
         command = f"{build_ssh_command(data['host'])} {command}"
 
-    proc = subprocess.Popen(split(command), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-    return [Text(x.rstrip()) for x in proc.communicate()[0].splitlines()]
+    proc = subprocess.run(split(command), stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+    return [Text(x.rstrip()) for x in proc.stdout.splitlines()]
 
 
 # noinspection PyStatementEffect
@@ -126,17 +132,17 @@ class SwarmListView(ListView):
                     data.append({'stack': parts[0].strip(), 'container': parts[1].strip(), 'host': parts[2].strip(),
                                  'image': parts[3].strip()})
         except Exception as _e:
-            logging.error(traceback.format_exc())
+            logging.exception('Unable to list swarm containers')
 
         return data
 
     def double_click_callback(self):
-        logging.debug(f'{self.name}] {self.selected.item_data["container"]} double_click_callback')
+        logging.debug('%s] %s double_click_callback', self.name, self.selected.item_data["container"])
         swarm_connect(self.selected.item_data)
 
     @staticmethod
     def popup_info_dialog(data):
-        cols, rows = raw_display.Screen().get_cols_rows()
+        cols, rows = get_cols_rows()
         d = DialogDisplay(f"Container Inpsection: {data['name']}", cols - 20, rows - 6,
                           body=Pile([
                               ListBox(
@@ -153,7 +159,7 @@ class SwarmListView(ListView):
         pass
 
     def keypress_callback(self, size, key, list_item: ListItem = None):
-        logging.debug(f'a ListViewHandler[{self.name}] {size} {key} pressed')
+        logging.debug('a ListViewHandler[%s] %s %s pressed', self.name, size, key)
         if key in ['c', 'b']:
             self.connect(list_item.item_data)
         elif key == 's':
@@ -162,7 +168,7 @@ class SwarmListView(ListView):
 
     # noinspection PyRedeclaration
     def keypress_callback(self, size, key, data: any = None):
-        logging.debug(f'b ListViewHandler[{self.name}] {size} {key} pressed')
+        logging.debug('b ListViewHandler[%s] %s %s pressed', self.name, size, key)
         if key == 'c':
             swarm_connect(data, shell='bash')
         if key == 'i':
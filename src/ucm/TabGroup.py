@@ -72,17 +72,17 @@ class TabGroupNode(object):
                 logging.info("moving to walker")
                 self.next.container.walker.set_focus(self.next.container_pos)
             else:
-                logging.error(f"{self.next.container} no handling enabled")
+                logging.error("%s no handling enabled", self.next.container)
         else:
             logging.error("container ref is not good")
 
 
 class TabGroupButton(Button, TabGroupNode):
-    button_right = Text("")
-    button_left = Text("")
+    # urwid's Button.__init__ only reads these, so one empty Text serves both sides of every button
+    button_right = button_left = Text("")
 
     def keypress(self, size, key):
-        logging.debug(f"TabGroupButton.keypress({size},{key}")
+        logging.debug("TabGroupButton.keypress(%s,%s)", size, key)
         if key == 'tab':
             super().focus_next()
         super().keypress(size, key)
@@ -90,7 +90,7 @@ class TabGroupButton(Button, TabGroupNode):
 
 class TabGroupRadioButton(RadioButton, TabGroupNode):
     def keypress(self, size, key):
-        logging.debug(f"TabGroupRadioButton.keypress({size},{key})")
+        logging.debug("TabGroupRadioButton.keypress(%s,%s)", size, key)
         if key == 'tab':
             super().focus_next()
         super().keypress(size, key)
@@ -98,7 +98,7 @@ class TabGroupRadioButton(RadioButton, TabGroupNode):
 
 class TabGroupEdit(Edit, TabGroupNode):
     def keypress(self, size, key):
-        logging.debug(f"TabGroupEdit.keypress({size},{key}")
+        logging.debug("TabGroupEdit.keypress(%s,%s)", size, key)
         if key == 'tab':
             super().focus_next()
         super().keypress(size, key)
@@ -108,7 +108,8 @@ class TabGroupManager(object):
     def __init__(self):
         self.groups = OrderedDict()
 
-    def add(self, name, frame, frame_position, base_widget, pile=None, pile_pos=-1):
+    @staticmethod
+    def build_group(frame, frame_position, base_widget, pile=None, pile_pos=-1):
         if hasattr(base_widget, 'contents'):
             nodes = []
             for idx, item in enumerate(base_widget.contents):
@@ -116,14 +117,23 @@ class TabGroupManager(object):
                 if hasattr(w, 'set_current'):
                     w.set_current(frame, frame_position, base_widget, idx, pile=pile, pile_pos=pile_pos)
                     nodes.append(w)
+            return nodes
+        logging.debug(' TYPE: %s', type(base_widget))
+        if hasattr(base_widget, 'set_current'):
+            base_widget.set_current(frame, frame_position, base_widget, 0, pile=pile, pile_pos=pile_pos)
+            return [base_widget]
+        return None
+
+    def add(self, name, frame, frame_position, base_widget, pile=None, pile_pos=-1):
+        nodes = self.build_group(frame, frame_position, base_widget, pile=pile, pile_pos=pile_pos)
+        if nodes is not None:
             self.groups[name] = nodes
             self.relink()
-        else:
-            logging.debug(f' TYPE: {type(base_widget)}')
-            if hasattr(base_widget, 'set_current'):
-                base_widget.set_current(frame, frame_position, base_widget, 0, pile=pile, pile_pos=pile_pos)
-                self.groups[name] = [base_widget]
-                self.relink()
+
+    def activate(self, groups: OrderedDict):
+        """Swaps in groups prepared with build_group, relinking the tab order once."""
+        self.groups.update(groups)
+        self.relink()
 
     # noinspection PyBroadException
     def relink(self):
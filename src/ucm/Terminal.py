@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+#
+#  Copyright (C) 2022 Robert Szabo.
+#
+#  This software can be used by anyone at no cost, however,
+#  if you like using my software and can support - please
+#  donate money to a children's hospital of your choice.
+#  This program is free software: you can redistribute it
+#  and/or modify it under the terms of the GNU General Public
+#  License as published by the Free Software Foundation:
+#  GNU GPLv3. You must include this entire text with your
+#  distribution.
+#  This program is distributed in the hope that it will be
+#  useful, but WITHOUT ANY WARRANTY; without even the implied
+#  warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR
+#  PURPOSE.
+#  See the GNU General Public License for more details.
+#
+
+
+import logging
+import signal
+import subprocess
+
+# docker exec exit codes when the requested shell cannot be run (126) or found (127) in the container
+SHELL_NOT_RUNNABLE = (126, 127)
+
+
+def ignore_signal(_signum, _frame):
+    pass
+
+
+def run_in_terminal(command: list) -> int:
+    """Runs command on the (stopped) screen's terminal and returns its exit status, like os.system.
+
+    While the command runs Ctrl-C / Ctrl-\\ only reach the command, ucm keeps running. A python handler is
+    installed instead of SIG_IGN so the command itself still starts with the default signal dispositions.
+    """
+    previous = {sig: signal.signal(sig, ignore_signal) for sig in (signal.SIGINT, signal.SIGQUIT)}
+    try:
+        return subprocess.call(command)
+    except OSError as e:
+        logging.error('Unable to run %s: %s', command, e)
+        print(f"Unable to run {command[0]}: {e.strerror}")
+        return 127
+    finally:
+        for sig, handler in previous.items():
+            if handler is not None:
+                signal.signal(sig, handler)
+
+
+def shell_missing(exec_command: list, shell: str) -> bool:
+    """True when exec_command (e.g. docker exec <container>) cannot run shell, probed without a terminal.
+
+    The exit status of an interactive session can't tell this apart from the user's last command not being found.
+    """
+    try:
+        rc = subprocess.call(exec_command + [shell, '-c', ':'],
+                             stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    except OSError:
+        return False
+    return rc in SHELL_NOT_RUNNABLE
+
+# vim: ts=4 sw=4 et
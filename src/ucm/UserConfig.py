@@ -21,13 +21,45 @@
 # Created by rszabo50 at 2022-02-09
 
 from pathlib import Path
+import logging
 import os
 import traceback
 import yaml
 import getpass
+import sys
 import subprocess
 from shutil import which
 
+# libyaml's loader is several times faster, fall back to the pure python one when pyyaml was built without it
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+
+SSH_CONFIG_TEMPLATE = """\
+# Each ssh connection is defined as:
+# - name: hostname or identifier
+#   address: ip or dns resolvable name
+#   user: username to connect with
+#   port: tcp port to use: default: 22
+#   identity: <identity file to use if needed and its not your default key>
+#   options: <any other ssh options, supported by the command line
+#   category: <identifier ; makes filtering easier>
+# Note: Because UCM will use the address variable to connect, common options like the identity file, port etc
+#       can be done via your ~/.ssh/config e.g.
+#         Host: 192.168.0.*
+#             GSSAPIAuthentication no
+#             StrictHostKeyChecking no
+#             UserKnownHostsFile /dev/null
+#             IdentityFile ~/.ssh/MyIdentifyFile.pem
+
+ - name: localhost
+   address: 127.0.0.1
+   user: {user}
+   category: sample
+"""
+
 
 class UserConfig(dict):
     __instance = None
@@ -37,68 +69,64 @@ class UserConfig(dict):
             cls.__instance = dict.__new__(cls)
         return cls.__instance
 
+    def __getattr__(self, k):
+        try:
+            return self[k]
+        except KeyError:
+            raise AttributeError(k)
+
     def set(self, k, v, overwrite=True):
         if overwrite or self.get(k) is None:
-            setattr(self.__instance, k, v)
-
-    def get(self, k):
-        return getattr(self.__instance, k) if hasattr(self.__instance, k) else None
+            self[k] = v
 
     def initialize(self):
-        self.set('config_folder', f"{Path.home()}/.ucm", overwrite=False)
-        self.set('ssh_config_file', f"{Path.home()}/.ucm/ssh_connections.yml", overwrite=False)
-        setattr(self, 'docker', which('docker'))
-        setattr(self, 'swarm_host', UserConfig.is_swarm_host())
+        config_folder = Path.home() / '.ucm'
+        self.set('config_folder', config_folder, overwrite=False)
+        self.set('ssh_config_file', config_folder / 'ssh_connections.yml', overwrite=False)
+        self.set('docker', which('docker'))
+        self.set('swarm_host', UserConfig.is_swarm_host())
         self.build_dot_ucm()
         self.load_ssh_config()
 
     def load_ssh_config(self):
-        self.set('ssh_connections', UserConfig.load_yaml(self.get("ssh_config_file"), must_exist=True))
+        connections = UserConfig.load_yaml(self.get("ssh_config_file"), must_exist=True)
+        if connections:
+            skipped = [record for record in connections if not isinstance(record, dict)]
+            if skipped:
+                logging.warning('Skipping %d ssh connection entries that are not mappings: %s', len(skipped), skipped)
+            # intern the yaml keys so the views' literal key lookups match on identity
+            connections = [{sys.intern(k) if isinstance(k, str) else k: v for k, v in record.items()}
+                           for record in connections if isinstance(record, dict)]
+            # default the category here, not when a row is formatted, so filtering sees it on every record
+            for record in connections:
+                record.setdefault('category', '---')
+        self.set('ssh_connections', connections)
 
     @staticmethod
     def is_swarm_host():
         if which('docker') is not None:
-            result = subprocess.check_output(['docker', 'info', '--format', '{{.Swarm.ControlAvailable}}'],
-                                             stderr=subprocess.STDOUT)
-            return result.splitlines()[0].decode("utf-8").strip().lower() == 'true'
+            try:
+                result = subprocess.run(['docker', 'info', '--format', '{{.Swarm.ControlAvailable}}'],
+                                        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                        universal_newlines=True, timeout=2)
+            except (subprocess.TimeoutExpired, FileNotFoundError):
+                return False
+            return result.returncode == 0 and result.stdout.strip().lower() == 'true'
         else:
             return False
 
     def build_dot_ucm(self):
-        if not os.path.exists(self.get('config_folder')):
-            os.makedirs(self.get('config_folder'))
-        if not os.path.exists(self.get('ssh_config_file')):
-            with open(self.get('ssh_config_file'), 'w') as f:
-                f.write('\n'.join([
-                    "# Each ssh connection is defined as:",
-                    "# - name: hostname or identifier",
-                    "#   address: ip or dns resolvable name",
-                    "#   user: username to connect with",
-                    "#   port: tcp port to use: default: 22",
-                    "#   identity: <identity file to use if needed and its not your default key>",
-                    "#   options: <any other ssh options, supported by the command line",
-                    "#   category: <identifier ; makes filtering easier>",
-                    "# Note: Because UCM will use the address variable to connect, common options like the identity file, port etc",
-                    "#       can be done via your ~/.ssh/config e.g.",
-                    "#         Host: 192.168.0.*",
-                    "#             GSSAPIAuthentication no",
-                    "#             StrictHostKeyChecking no",
-                    "#             UserKnownHostsFile /dev/null",
-                    "#             IdentityFile ~/.ssh/MyIdentifyFile.pem",
-                    "",
-                    " - name: localhost",
-                    "   address: 127.0.0.1",
-                    f"   user: {getpass.getuser()}",
-                    "   category: sample",
-                    ""
-                ]))
+        self.get('config_folder').mkdir(parents=True, exist_ok=True)
+        ssh_config_file = self.get('ssh_config_file')
+        if not ssh_config_file.exists():
+            ssh_config_file.write_text(SSH_CONFIG_TEMPLATE.format(user=getpass.getuser()))
 
     @staticmethod
     def load_yaml(filename: str, must_exist: bool = False):
         if os.path.exists(filename):
             with open(filename, "r") as stream:
                 try:
-                    return yaml.load(stream, Loader=yaml.SafeLoader)
+                    return yaml.load(stream, Loader=SafeLoader)
                 except yaml.YAMLError as _e:
                     traceback.print_exc()
                     raise RuntimeError(f"Unable to load {filename}.")
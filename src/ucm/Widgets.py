@@ -21,15 +21,17 @@
 
 # Created by rszabo50 at 2022-01-28
 
+import functools
 import logging
 import time
 import re
 import os
+from collections import OrderedDict
 
 from urwid import AttrWrap, AttrMap, AttrSpec, Button, BoxAdapter, Columns, Divider, Filler, \
     LineBox, Padding, Pile, Text, WidgetWrap
-from urwid import connect_signal, disconnect_signal, emit_signal, register_signal
-from urwid import raw_display, SimpleFocusListWalker, SimpleListWalker
+from urwid import connect_signal, emit_signal, register_signal
+from urwid import raw_display, ListWalker, SimpleListWalker
 from urwid import CENTER, LEFT, RIGHT
 from panwid.listbox import ScrollingListBox
 from panwid.scroll import ScrollBar
@@ -37,21 +39,64 @@ from ucm.TabGroup import TabGroupEdit, TabGroupNode
 from ucm.Registry import Registry
 
 
+# terminals known to understand synchronized output (DEC private mode 2026)
+SYNC_OUTPUT_TERM_PROGRAMS = ('iTerm.app', 'WezTerm', 'vscode', 'contour')
+SYNC_OUTPUT_TERMS = ('xterm-kitty', 'foot', 'alacritty', 'wezterm', 'contour')
+
+
+def sync_output_supported() -> bool:
+    if os.environ.get('TERM_PROGRAM', '') in SYNC_OUTPUT_TERM_PROGRAMS or 'WT_SESSION' in os.environ:
+        return True
+    return os.environ.get('TERM', '').startswith(SYNC_OUTPUT_TERMS)
+
+
+class SyncScreen(raw_display.Screen):
+    """raw_display.Screen that has the terminal buffer each frame and show it at once, avoiding tearing."""
+    BEGIN_SYNC = '\x1b[?2026h'
+    END_SYNC = '\x1b[?2026l'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.sync_output = sync_output_supported()
+        self._hold_flush = False
+
+    def draw_screen(self, maxres, r):
+        if not self.sync_output:
+            return super().draw_screen(maxres, r)
+        self.write(self.BEGIN_SYNC)
+        self._hold_flush = True
+        try:
+            super().draw_screen(maxres, r)
+        finally:
+            self._hold_flush = False
+            self.write(self.END_SYNC)
+            self.flush()
+
+    def flush(self):
+        # the frame is flushed once, together with the end of the synchronized update
+        if not self._hold_flush:
+            super().flush()
+
+
+def get_screen() -> SyncScreen:
+    if Registry().get('screen') is None:
+        Registry().screen = SyncScreen()
+    return Registry().screen
+
+
+def get_cols_rows():
+    """Returns the terminal size, sharing one Screen instead of creating one per caller."""
+    if Registry().get('main_loop') is not None:
+        return Registry().main_loop.screen.get_cols_rows()
+    return get_screen().get_cols_rows()
+
+
 class IdWidget(AttrMap):
     def __init__(self, w: any, attr_map: any = None, focus_map: any = None, widget_id: str = None):
         super().__init__(w, attr_map, focus_map)
-        base_id = widget_id
         if widget_id is not None:
-            if hasattr(Registry(), widget_id):
-                logging.warning(f"Registry already has object with widget_id={widget_id}")
-                counter = 1
-                while True:
-                    widget_id = f'{base_id}_{counter}'
-                    if not hasattr(Registry(), widget_id):
-                        break
-                    counter += 1
-            logging.debug(f"Registering widget with id={widget_id}")
-            setattr(Registry(), widget_id, self)
+            widget_id = Registry().register_widget(widget_id, self)
+            logging.debug("Registering widget with id=%s", widget_id)
 
 
 class UCMScrollBar(ScrollBar):
@@ -67,13 +112,21 @@ class HeaderButton(Button):
 
 
 class Clock(IdWidget):
+    __slots__ = ('_last_sec',)
 
     def __init__(self, widget_id: str = None):
-        super().__init__(Text(time.strftime('%H:%M:%S'), align=RIGHT), widget_id=widget_id)
+        self._last_sec = int(time.time())
+        super().__init__(Text(time.strftime('%H:%M:%S', time.localtime(self._last_sec)), align=RIGHT),
+                         widget_id=widget_id)
 
     def update_clock(self, _data: any = None, _other: any = None):
-        self.original_widget.set_text(time.strftime('%H:%M:%S'))
-        Registry().main_loop.set_alarm_in(1, self.update_clock)
+        now = time.time()
+        sec = int(now)
+        if sec != self._last_sec:
+            self.original_widget.set_text(time.strftime('%H:%M:%S', time.localtime(sec)))
+            self._last_sec = sec
+        # wake up on the next second boundary so the display does not drift
+        Registry().main_loop.set_alarm_in(1 - (now - sec), self.update_clock)
 
     def start(self):
         Registry().main_loop.set_alarm_in(1, self.update_clock)
@@ -109,6 +162,7 @@ class Footer(IdWidget):
 
 
 class ListItem(IdWidget):
+    __slots__ = ('item_data', 'keypress_callback', 'formatter', 'label_w')
 
     def __init__(self, item_data: any, index: int = 0, formatter: any = None,
                  unselected: str = 'normal', selected: str = 'dark red', keypress_callback: any = None,
@@ -116,23 +170,39 @@ class ListItem(IdWidget):
         self.item_data = item_data
         self.item_data['index'] = index
         self.keypress_callback = keypress_callback
+        self.formatter = formatter
+        self.label_w = None
 
         label = "no label set"
-        if type(item_data) == str:
+        if isinstance(item_data, str):
             label = item_data
         elif formatter is not None:
             label = formatter(item_data)
 
-        if type(label) == str:
-            super().__init__(WidgetWrap(AttrWrap(Text(label), unselected, selected)), widget_id=widget_id)
+        if isinstance(label, str):
+            self.label_w = Text(label)
+            super().__init__(self.label_w, attr_map=unselected, focus_map=selected, widget_id=widget_id)
         else:
             super().__init__(label, widget_id=widget_id)
 
+    def set_index(self, index: int):
+        """Moves the item to a new row index, returns False if it has to be rebuilt instead."""
+        if self.item_data['index'] == index:
+            return True
+        if self.label_w is None or self.formatter is None:
+            return False
+        self.item_data['index'] = index
+        label = self.formatter(self.item_data)
+        if not isinstance(label, str):
+            return False
+        self.label_w.set_text(label)
+        return True
+
     def selectable(self):
         return True
 
     def keypress(self, size, key):
-        logging.debug(f"{key} key pressed")
+        logging.debug("%s key pressed", key)
         if key in ['j', 'down']:
             return 'down'
         if key in ['k', 'up']:
@@ -142,11 +212,68 @@ class ListItem(IdWidget):
         return key
 
 
+class ListItemWalker(ListWalker):
+    """ListWalker over a list of records that only builds ListItems for the rows urwid asks for."""
+
+    def __init__(self, factory: any, cache_size: int = 256):
+        self.data = []
+        self.focus = 0
+        self.factory = factory
+        self.cache_size = cache_size
+        self._items = OrderedDict()
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, position):
+        if position < 0:
+            raise IndexError(position)
+        item_data = self.data[position]
+        key = id(item_data)
+        list_item = self._items.get(key)
+        # a cached item is reused when its record is still listed, even if it moved to another row
+        if list_item is not None and list_item.item_data is item_data and list_item.set_index(position):
+            self._items.move_to_end(key)
+            return list_item
+        list_item = self.factory(item_data, position)
+        self._items[key] = list_item
+        if len(self._items) > self.cache_size:
+            self._items.popitem(last=False)
+        return list_item
+
+    def set_data(self, data: list):
+        self.data = data
+        self.focus = 0
+        self._modified()
+
+    def set_focus(self, position):
+        if self.data and not 0 <= position < len(self.data):
+            raise IndexError(position)
+        self.focus = position
+        self._modified()
+
+    def next_position(self, position):
+        if position >= len(self.data) - 1:
+            raise IndexError(position)
+        return position + 1
+
+    def prev_position(self, position):
+        if position <= 0:
+            raise IndexError(position)
+        return position - 1
+
+    def positions(self, reverse=False):
+        if reverse:
+            return range(len(self.data) - 1, -1, -1)
+        return range(len(self.data))
+
+
 class ListViewListBox(IdWidget):
+    __slots__ = ('double_click_callback', 'last_time_clicked')
 
     def __init__(self, body: any, double_click_callback: any = None, widget_id: str = None):
         self.double_click_callback = double_click_callback
-        self.last_time_clicked = time.time()
+        self.last_time_clicked = 0.0
         super().__init__(ScrollingListBox(body, with_scrollbar=UCMScrollBar), widget_id)
 
     def set_double_click_callback(self, double_click_callback: any = None):
@@ -154,13 +281,13 @@ class ListViewListBox(IdWidget):
         return self
 
     def mouse_event(self, size, event, button, col, row, focus):
-        logging.debug(f"{event} {button} {size} {focus}")
-        if event == 'mouse release':
-            now = time.time()
-            if self.last_time_clicked and (now - self.last_time_clicked < 0.3):
-                logging.debug(f"Triggering mouse double click event")
-                if self.double_click_callback is not None:
-                    self.double_click_callback()
+        logging.debug("%s %s %s %s", event, button, size, focus)
+        if event == 'mouse release' and self.double_click_callback is not None:
+            # monotonic so a wall clock adjustment can't fake (or swallow) a double click
+            now = time.monotonic()
+            if now - self.last_time_clicked < 0.3:
+                logging.debug("Triggering mouse double click event")
+                self.double_click_callback()
             self.last_time_clicked = now
         else:
             return super().mouse_event(size, event, button, col, row, focus)
@@ -168,6 +295,8 @@ class ListViewListBox(IdWidget):
 
 # noinspection PyRedeclaration
 class ListView(IdWidget, TabGroupNode):
+    filter_delay = 0.15
+    label_cache_size = 1024
 
     def __init__(self, name: str, filter_fields: list = None, widget_id: str = None):
         self.name = name
@@ -176,9 +305,16 @@ class ListView(IdWidget, TabGroupNode):
         self.filter_edit = None
         self.filter_columns = None
         self.view = None
-        self.filter_fields = [] if filter_fields is None else filter_fields
+        self.filter_fields = () if filter_fields is None else tuple(filter_fields)
+        self._filter_cache = {}
+        self._last_filter = None
+        self._last_result = None
+        self._filter_alarm = None
+        self._label_cache = {}
         register_signal(self.__class__, ['record_selected'])
-        self.walker = SimpleFocusListWalker([])
+        self.walker = ListItemWalker(self.build_item)
+        connect_signal(self.walker, "modified", self.modified)
+        connect_signal(self, 'record_selected', self.record_selected)
         super().__init__(
             WidgetWrap(ListViewListBox(self.walker).set_double_click_callback(self.double_click_callback)),
             widget_id=widget_id)
@@ -190,36 +326,41 @@ class ListView(IdWidget, TabGroupNode):
             emit_signal(self, 'record_selected', list_item)
 
     def record_selected(self, list_item: ListItem):
-        logging.debug(f"Record selected : {list_item} {list_item.item_data}")
+        logging.debug("Record selected : %s %s", list_item, list_item.item_data)
         self.selected = list_item
         self.selected_callback(list_item)
 
     def double_click_callback(self):
-        logging.debug(f'ListViewHandler[{self.name}] double_click_callback')
+        logging.debug('ListViewHandler[%s] double_click_callback', self.name)
 
     def selected_callback(self, list_item: ListItem):
-        logging.debug(f'ListViewHandler[{self.name}] {list_item.item_data} selected_callback')
+        logging.debug('ListViewHandler[%s] %s selected_callback', self.name, list_item.item_data)
 
     def _set_data(self, data: list = None):
         if data is None:
             data = []
 
-        disconnect_signal(self.walker, 'modified', self.modified)
-        disconnect_signal(self, 'record_selected', self.record_selected)
-        self.walker.clear()
-
-        self.walker.extend(
-            [ListItem(
-                item_data,
-                index=idx,
-                formatter=self.formatter,
-                keypress_callback=self.keypress_callback)
-                for idx, item_data in enumerate(data)])
-
-        connect_signal(self.walker, "modified", self.modified)
-        connect_signal(self, 'record_selected', self.record_selected)
-
-        self.walker.set_focus(0)
+        # swaps the rows and resets the focus in one step, its single 'modified' signal selects the first row
+        self.walker.set_data(data)
+
+    def build_item(self, item_data: any, index: int):
+        return ListItem(
+            item_data,
+            index=index,
+            formatter=self.cached_formatter,
+            keypress_callback=self.keypress_callback)
+
+    def cached_formatter(self, record: any):
+        # labels include the row index, so a record gets one label per row it has been shown on
+        key = (id(record), record['index'])
+        cached = self._label_cache.get(key)
+        if cached is not None and cached[0] is record:
+            return cached[1]
+        if len(self._label_cache) >= self.label_cache_size:
+            self._label_cache.clear()
+        label = self.formatter(record)
+        self._label_cache[key] = (record, label)
+        return label
 
     def get_header(self):
         return f'Data'
@@ -238,28 +379,45 @@ class ListView(IdWidget, TabGroupNode):
         self._set_data(self.filter_data(filter_string))
 
     def keypress_callback(self, size, key, item_data: any = None):
-        logging.debug(f'********************** keypress_callback[{self.name}] {key} pressed')
+        logging.debug('********************** keypress_callback[%s] %s pressed', self.name, key)
         if key == 'tab':
             logging.debug("Tab hit attempting to move focus to filter_columns")
             if self.view is not None:
                 self.view.pile.set_focus(self.view.filter_pile_pos)
                 self.filter_columns.set_focus(1)
 
-    def _evaluate(self, filter_string: str, record: dict):
-        for key in self.filter_fields:
-            if key in record and filter_string.lower() in record[key].lower():
-                return True
-        return False
+    def _filter_text(self, record: dict):
+        cached = self._filter_cache.get(id(record))
+        if cached is not None and cached[0] is record:
+            return cached[1]
+        # fields are joined with a newline, which can't be typed into the filter edit,
+        # so a match never spans two fields
+        return '\n'.join(str(record[key]) for key in self.filter_fields if key in record).lower()
 
     def filter_data(self, filter_string: str):
-        data = self.fetch_data()
         if filter_string is None or filter_string.strip() == '':
-            return data
-        return list(filter(lambda k: self._evaluate(filter_string, k), data))
+            self._last_filter = None
+            self._last_result = None
+            return self.fetch_data()
+        filter_string = filter_string.lower()
+        if self._last_filter is not None and filter_string.startswith(self._last_filter):
+            # the user is narrowing the filter, so the matches are a subset of the previous ones
+            data = self._last_result
+        else:
+            data = self.fetch_data()
+            # the cache holds a reference to each record, so an id can't be reused while it is cached
+            self._filter_cache = {id(k): (k, self._filter_text(k)) for k in data}
+        # every record being filtered came from the last fetch, so its text is in the cache
+        filter_cache = self._filter_cache
+        result = [k for k in data if filter_string in filter_cache[id(k)][1]]
+        self._last_filter = filter_string
+        self._last_result = result
+        return result
 
     def filters_clear(self):
         self.filter_edit.edit_text = ""
-        self.filter_columns.set_focus(1)
+        if self.filter_columns.focus_position != 1:
+            self.filter_columns.set_focus(1)
 
     def get_filter_widgets(self):
         self.filter_edit = TabGroupEdit(align=LEFT)
@@ -271,21 +429,32 @@ class ListView(IdWidget, TabGroupNode):
         return self.filter_columns
 
     def filter_action(self, _edit_widget, text_input):
-        # noinspection PyProtectedMember
-        self.filter_and_set(text_input)
+        main_loop = Registry().get('main_loop')
+        if main_loop is None:
+            self.filter_and_set(text_input)
+            return
+        # coalesce fast typing into a single rebuild of the list once the user pauses
+        if self._filter_alarm is not None:
+            main_loop.remove_alarm(self._filter_alarm)
+        self._filter_alarm = main_loop.set_alarm_in(self.filter_delay, self.filter_alarm_cb, text_input)
         # self.filter_columns.set_focus(1) ## this needs to be disabled for tab group support
 
+    def filter_alarm_cb(self, _loop, text_input):
+        self._filter_alarm = None
+        self.filter_and_set(text_input)
+
 
 class View(IdWidget):
     def __init__(self, list_view: ListView, widget_id: str = None):
         self.list_view = list_view
-        terminal_cols, terminal_rows = raw_display.Screen().get_cols_rows()
+        terminal_cols, terminal_rows = get_cols_rows()
         list_rows = (terminal_rows - 11)  # header:3 + footer: 3 + border:2 + tableHeader: 1 + filter: 2 = 11
 
-        if type(list_view.get_header()) == str:
-            list_view.header_text_w = AttrMap(Text(list_view.get_header()), attr_map='table header', focus_map='table header')
+        header = list_view.get_header()
+        if isinstance(header, str):
+            list_view.header_text_w = AttrMap(Text(header), attr_map='table header', focus_map='table header')
         else:
-            list_view.header_text_w = list_view.get_header()
+            list_view.header_text_w = header
 
         self.pile = Pile([
             list_view.header_text_w,
@@ -313,52 +482,69 @@ class HelpBody(IdWidget):
     ], 'normal': AttrSpec('light gray', 'default'), 'bullet': AttrSpec('light cyan', 'default'),
         'bold': AttrSpec('light cyan', 'default')}
 
-    # noinspection PyPep8
     def __init__(self, widget_id: str = None):
-        self.w_list = []
+        self.w_list = [Text(line_fmt) for line_fmt in self.parse()]
+        super().__init__(Pile([
+            ScrollingListBox(SimpleListWalker(self.w_list),
+                             with_scrollbar=UCMScrollBar)
+        ]), widget_id=widget_id)
+
+    # noinspection PyPep8
+    @classmethod
+    @functools.lru_cache(maxsize=1)
+    def parse(cls):
+        lines = []
 
-        for line in self.load():
+        for line in cls.load():
             line = line.expandtabs(4)
             line_fmt = []
 
-            header_match = self.heading_re.match(line.rstrip())
-            bullet_match = self.bullet_re.match(line)
+            # most lines are plain text, only run the regexes when the first character can match
+            header_match = None
+            bullet_match = None
+            if line[:1] == '#':
+                header_match = cls.heading_re.match(line.rstrip())
+            elif line.lstrip()[:1] == '*':
+                bullet_match = cls.bullet_re.match(line)
 
             if header_match:
                 try:
                     line_fmt.append(
-                        (self.palette['h'][len(header_match.group(1))],
+                        (cls.palette['h'][len(header_match.group(1))],
                          f"{header_match.group(2).replace('*', '').replace('`', '')}"))
-                    self.w_list.append(Text(line_fmt))
+                    lines.append(line_fmt)
                     continue
                 except IndexError as _e:
-                    logging.error(f'{header_match.group(1)}')
-                    logging.error(f'{header_match.group(2)}')
+                    logging.error('%s', header_match.group(1))
+                    logging.error('%s', header_match.group(2))
                     pass
             elif bullet_match:
-                line_fmt.append((self.palette['bullet'], u"\u25c6 %s" % (bullet_match.group(3))))
-                self.w_list.append(Text(line_fmt))
+                line_fmt.append((cls.palette['bullet'], u"\u25c6 %s" % (bullet_match.group(3))))
+                lines.append(line_fmt)
                 continue
 
             if not "```" in line:
-                line_fmt.append((self.palette['normal'], line.rstrip()))
+                line_fmt.append((cls.palette['normal'], line.rstrip()))
             else:
-                for token in line.split("```"):
-                    if "```%s```" % token in line:
-                        line_fmt.append((self.palette['bold'], token))
+                tokens = line.split("```")
+                last = len(tokens) - 1
+                for idx, token in enumerate(tokens):
+                    # odd tokens sit between a pair of ``` markers, unless the last marker is left open
+                    if idx % 2 == 1 and idx < last:
+                        line_fmt.append((cls.palette['bold'], token))
                     elif len(token) > 0:
-                        line_fmt.append((self.palette['normal'], token))
-            self.w_list.append(Text(line_fmt))
-        super().__init__(Pile([
-            ScrollingListBox(SimpleListWalker(self.w_list),
-                             with_scrollbar=UCMScrollBar)
-        ]), widget_id=widget_id)
-
-    # noinspection PyMethodMayBeStatic,PyBroadException
-    def load(self):
+                        line_fmt.append((cls.palette['normal'], token))
+                if not line_fmt:
+                    line_fmt.append((cls.palette['normal'], ''))
+            lines.append(line_fmt)
+        return tuple(lines)
+
+    # noinspection PyBroadException
+    @staticmethod
+    def load():
         try:
-            with (open(f'{os.path.dirname(__file__)}/help.txt', "r")) as f:
-                return f.readlines()
+            with (open(f'{os.path.dirname(__file__)}/help.txt', "r", encoding='utf-8')) as f:
+                return f.read().splitlines()
         except:
             return []
 
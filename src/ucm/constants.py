@@ -26,7 +26,7 @@ PROGRAM_TITLE = 'Urwid rendered Connection Manager'
 PROGRAM_VERSION = '0.1.2'
 SCM_URL = 'https://github.com/rszabo50/ucm'
 
-MAIN_PALETTE = [
+MAIN_PALETTE = (
     ('header', 'dark cyan', 'default', "default", "dark cyan", "default"),
     ('table header', 'white', 'dark cyan'),
     ("normal", "dark cyan", "default"),
@@ -56,6 +56,6 @@ MAIN_PALETTE = [
     ('focustext', 'light gray', 'dark blue'),
     ('button normal', 'white', 'dark blue', 'standout'),
     ('button select', 'white', 'dark green')
-]
+)
 
 # vim: ts=4 sw=4 et